@@ -1,14 +1,17 @@
+import hashlib
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import plotly.express as px
 import plotly.graph_objects as go
 
-from model.embedder import get_embedding, EnhancedEmbedder
+from model.embedder import get_embedding, encode_texts, l2_normalize, EnhancedEmbedder, model_id
+from model.index import RecipeIndex
 from utils.filters import filter_with_preferences, apply_diversity_filter
 from utils.mood_analyzer import MoodAnalyzer
 from utils.visualizer import create_mood_visualization, create_mood_dashboard
+from utils.data_loader import data_loader
+from config import EMBEDDING_WEIGHTS
 
 # Page config
 st.set_page_config(
@@ -44,10 +47,48 @@ def load_data():
     df = pd.read_csv("data/recipes.csv", on_bad_lines='skip')
     df["description"] = df["description"].fillna("")
     df["cuisine"] = df["cuisine"].fillna("Unknown")
+    df["has_comfort"] = df["description"].str.contains("comfort", case=False, regex=False)
     return df
 
 df = load_data()
 
+def embedding_cache_key(df):
+    """Fingerprint of everything the cached recipe vectors depend on"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_id.encode('utf-8'))
+    digest.update(enhanced_embedder.table_signature())
+    for column in ('description', 'cuisine', 'meal_time', 'cook_time'):
+        digest.update(pd.util.hash_pandas_object(df[column], index=False).values.tobytes())
+    return digest.hexdigest()
+
+# Precompute recipe embeddings once; only the mood is embedded per query
+@st.cache_resource
+def load_recipe_embeddings(df):
+    recipe_ids = df['title'].values
+    cache_key = embedding_cache_key(df)
+    embeddings = data_loader.load_embeddings(recipe_ids, cache_key)
+    if embeddings is None:
+        embeddings = {
+            'text': encode_texts(df['description'].tolist()).astype(np.float32),
+            'features': enhanced_embedder.encode_features(
+                df['cuisine'], df['meal_time'], df['cook_time']
+            ).astype(np.float32)
+        }
+        data_loader.save_embeddings(embeddings, recipe_ids, cache_key)
+    
+    # Normalize feature rows once so their similarity is a single inner product
+    embeddings['features'] = l2_normalize(embeddings['features'])
+    
+    # Inner-product indexes; the enhanced one scores w * text + (1 - w) * features
+    text_weight = EMBEDDING_WEIGHTS['text']
+    embeddings['text_index'] = RecipeIndex(embeddings['text'])
+    embeddings['enhanced_index'] = RecipeIndex(np.hstack([
+        text_weight * embeddings['text'], (1 - text_weight) * embeddings['features']
+    ]))
+    return embeddings
+
+recipe_matrix = load_recipe_embeddings(df)
+
 # Sidebar for advanced options
 with st.sidebar:
     st.header("⚙️ Settings")
@@ -94,16 +135,19 @@ with col2:
 # Cuisine filter
 cuisine = st.selectbox("Choose a Cuisine", ["All", "Desi", "Arabic", "Western"])
 
-# Filter by cuisine
-filtered_df = df.copy()
+# Filter by cuisine, carrying row positions instead of copying the frame
 if cuisine != "All":
-    filtered_df = filtered_df[filtered_df["cuisine"] == cuisine]
-st.write(f"Recipes after cuisine filter: {len(filtered_df)}")
+    candidate_idx = np.flatnonzero(df["cuisine"].values == cuisine)
+else:
+    candidate_idx = np.arange(len(df))
+st.write(f"Recipes after cuisine filter: {len(candidate_idx)}")
 
 # Recommend button
 if st.button("🎯 Recommend Me a Meal", type="primary"):
     if mood.strip() == "":
         st.warning("Please describe your mood first.")
+    elif len(candidate_idx) == 0:
+        st.error("No matching meals found. Try adjusting your filters.")
     else:
         with st.spinner("Analyzing your mood and finding perfect matches..."):
             
@@ -114,63 +158,49 @@ if st.button("🎯 Recommend Me a Meal", type="primary"):
             if mood_tags:
                 st.info(f"🧠 Detected mood: {', '.join(mood_tags)} (sentiment: {sentiment:.2f})")
             
-            # Get embeddings
-            if use_enhanced_embeddings:
-                # Use enhanced embeddings for recipes
-                recipe_embeddings = []
-                for _, recipe in filtered_df.iterrows():
-                    emb = enhanced_embedder.get_enhanced_embedding(
-                        recipe['description'], recipe['cuisine'], 
-                        recipe['meal_time'], recipe['cook_time']
-                    )
-                    recipe_embeddings.append(emb)
-                
-                # Enhanced mood embedding (just text for now)
-                mood_embedding = get_embedding(mood)
-                # Pad mood embedding to match enhanced recipe embeddings
-                emb_len = len(recipe_embeddings[0])
-                mood_embedding = np.concatenate([mood_embedding, np.zeros(emb_len - len(mood_embedding))])
-                
-            else:
-                # Original approach
-                recipe_embeddings = [get_embedding(desc) for desc in filtered_df["description"]]
-                mood_embedding = get_embedding(mood)
-            
-            # Calculate similarities
-            similarities = cosine_similarity([mood_embedding], recipe_embeddings)[0]
-            filtered_df = filtered_df.copy()
-            filtered_df["similarity"] = similarities
+            # Build the query for the precomputed recipe index, reusing the
+            # mood embedding when only the filters changed since the last query
+            mood_key = hash(mood)
+            if st.session_state.get('_mood_cache_key') != mood_key:
+                st.session_state._mood_cache_val = l2_normalize(get_embedding(mood))
+                st.session_state._mood_cache_key = mood_key
+            mood_embedding = st.session_state._mood_cache_val
             
-            # Apply filters with user preferences
-            user_prefs = st.session_state.user_preferences if enable_learning else None
-            final_filtered = filtered_df  # For debugging, skip preference filtering
-            
-            # Add cuisine preference boost if learning enabled
-            if enable_learning and 'cuisine_boost' in final_filtered.columns:
-                final_filtered['final_score'] = final_filtered['similarity'] + final_filtered['cuisine_boost']
-                sort_column = 'final_score'
+            if use_enhanced_embeddings:
+                # Match recipe features against features synthesized from the chosen filters
+                mood_features = l2_normalize(
+                    enhanced_embedder.encode_features([cuisine], [meal_time], [cook_time])[0]
+                )
+                recipe_index = recipe_matrix['enhanced_index']
+                query = np.concatenate([mood_embedding, mood_features])
             else:
-                sort_column = 'similarity'
+                recipe_index = recipe_matrix['text_index']
+                query = mood_embedding
             
-            # Get top matches with diversity
-            top_matches = final_filtered.sort_values(by=sort_column, ascending=False).head(6)
+            # Get top matches with diversity; cuisine filtering happens inside the search
+            candidates = None if cuisine == "All" else candidate_idx
+            similarities, top_idx = recipe_index.search(query, 6, candidates)
+            top_matches = df.iloc[top_idx].assign(similarity=similarities)
             top_matches = apply_diversity_filter(top_matches, max_same_cuisine=2)
 
             if top_matches.empty:
                 st.error("No matching meals found. Try adjusting your filters.")
             else:
+                # Plain dicts for display; cheaper than a Series per row
+                records = top_matches.to_dict('records')
+                
                 # Store for feedback
-                st.session_state.last_recommendations = top_matches['title'].tolist()
+                st.session_state.last_recommendations = [row['title'] for row in records]
                 st.session_state.last_mood_tags = mood_tags
                 
                 # Show dashboard
                 if show_visualizations:
-                    create_mood_dashboard(top_matches.to_dict('records'))
+                    create_mood_dashboard(top_matches)
                 
                 # Display recommendations
                 st.header("🍽️ Your Personalized Recommendations")
                 
-                for i, (_, row) in enumerate(top_matches.iterrows()):
+                for i, row in enumerate(records):
                     with st.container():
                         st.markdown(f"### {i+1}. {row['title']}")
                         
@@ -200,7 +230,7 @@ if st.button("🎯 Recommend Me a Meal", type="primary"):
                     try:
                         viz_fig = create_mood_visualization(
                             top_matches, mood_embedding, 
-                            [recipe_embeddings[i] for i in top_matches.index]
+                            recipe_matrix['text'][df.index.get_indexer(top_matches.index)]
                         )
                         st.plotly_chart(viz_fig, use_container_width=True)
                     except Exception as e:
@@ -1,4 +1,5 @@
 """Configuration settings for Mood Food Recommender"""
+import os
 
 # App Settings
 APP_TITLE = "🍽️ Mood Food Recommender"
@@ -9,6 +10,9 @@ MAX_SAME_CUISINE = 2
 # ML Settings
 SIMILARITY_THRESHOLD = 0.1  # Minimum similarity score to show
 EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+EMBEDDING_BATCH_SIZE = 64  # Texts per transformer forward pass
+EMBEDDING_PROCESSES = int(os.environ.get('NUM_PROCESSES', 0))  # Worker processes for encoding (0 = off)
+MULTIPROCESS_MIN_TEXTS = 200  # Below this, process start-up costs more than it saves
 
 # Embedding weights for enhanced mode
 EMBEDDING_WEIGHTS = {
@@ -25,12 +29,20 @@ LEARNING_RATES = {
     'max_history': 50        # Maximum items to keep in history
 }
 
+# Profile persistence: flush after this many feedbacks or seconds, whichever comes first
+PROFILE_CONFIG = {
+    'save_every': 8,
+    'save_interval': 5.0,
+    'stream_min_history': 4000  # Feedback entries (~1 MB) above which saves are streamed
+}
+
 # Visualization settings
 VIZ_CONFIG = {
     'max_recipes_radar': 5,
     'pca_components': 2,
     'plot_height': 500,
-    'plot_width': 700
+    'plot_width': 700,
+    'projection_cache_size': 256  # Cached 2D projections, shared by all sessions
 }
 
 # Mood analysis settings
@@ -51,7 +63,7 @@ MOOD_CONFIG = {
 
 # Cache settings
 CACHE_CONFIG = {
-    'embedding_cache_size': 100,
+    'embedding_cache_size': 10000,
     'enable_data_cache': True,
     'cache_ttl': 3600  # 1 hour
 }
@@ -60,4 +72,5 @@ CACHE_CONFIG = {
 PATHS = {
     'data': 'data/recipes.csv',
     'embeddings_cache': 'cache/recipe_embeddings.pkl',
+    'onnx_model': 'onnx/model_int8.onnx',  # Created by python -m model.export_onnx
 }
\ No newline at end of file
@@ -1,14 +1,97 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from functools import lru_cache
+import hashlib
+import threading
+from cachetools import LRUCache
+from pathlib import Path
 import streamlit as st
+from config import (EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_PROCESSES,
+                    MULTIPROCESS_MIN_TEXTS, PATHS, CACHE_CONFIG)
 
-model = SentenceTransformer('all-MiniLM-L6-v2')  # Small and fast
+def _load_model():
+    """Use the quantized ONNX model when it has been exported, else PyTorch
+    
+    Returns the model and an identifier for the backend that was loaded.
+    """
+    if Path(PATHS['onnx_model']).exists():
+        try:
+            from model.onnx_embedder import OnnxEmbedder
+            return OnnxEmbedder(PATHS['onnx_model']), f"onnx:{PATHS['onnx_model']}"
+        except Exception:
+            # Missing runtime, tokenizer files or a broken graph: use PyTorch instead
+            pass
+    
+    # Imported here so the ONNX path never loads PyTorch
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL), EMBEDDING_MODEL  # Small and fast
+
+model, model_id = _load_model()
+
+# Embeddings shared across sessions, keyed on a short hash of the text
+_embedding_cache = LRUCache(maxsize=CACHE_CONFIG['embedding_cache_size'])
+_cache_lock = threading.Lock()
+
+def _cache_key(text):
+    """Fixed-size cache key so long texts don't bloat key storage"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+
+def get_embeddings_batch(texts):
+    """Embed many texts, serving repeats from the cache and batch-encoding the misses"""
+    texts = list(texts)
+    if not texts:
+        return encode_texts(texts)
+    
+    keys = [_cache_key(text) for text in texts]
+    with _cache_lock:
+        embeddings = [_embedding_cache.get(key) for key in keys]
+    
+    missing = {}
+    for key, text, emb in zip(keys, texts, embeddings):
+        if emb is None:
+            missing.setdefault(key, text)
+    
+    if missing:
+        fresh = dict(zip(missing, encode_texts(missing.values())))
+        with _cache_lock:
+            _embedding_cache.update(fresh)
+        embeddings = [fresh[key] if emb is None else emb for key, emb in zip(keys, embeddings)]
+    
+    return np.stack(embeddings)
 
-@lru_cache(maxsize=100)
 def get_embedding(text):
     """Cache frequent embeddings to improve performance"""
-    return model.encode([text])[0]
+    return get_embeddings_batch([text])[0]
+
+def encode_texts(texts):
+    """Encode many texts in one batched forward pass instead of one call per text"""
+    texts = list(texts)
+    
+    # Large sets on the PyTorch backend can be spread over worker processes
+    if (EMBEDDING_PROCESSES > 1 and len(texts) >= MULTIPROCESS_MIN_TEXTS
+            and hasattr(model, 'start_multi_process_pool')):
+        return _encode_multi_process(texts)
+    
+    embeddings = model.encode(
+        texts,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
+def _encode_multi_process(texts):
+    """Encode texts across EMBEDDING_PROCESSES CPU worker processes"""
+    pool = model.start_multi_process_pool(target_devices=['cpu'] * EMBEDDING_PROCESSES)
+    try:
+        # The model ends in a normalize layer, so outputs are already unit length
+        embeddings = model.encode_multi_process(texts, pool, batch_size=EMBEDDING_BATCH_SIZE)
+    finally:
+        model.stop_multi_process_pool(pool)
+    return np.asarray(embeddings, dtype=np.float32)
+
+def l2_normalize(x):
+    """Scale a vector (or each row of a matrix) to unit length so dot products are cosines"""
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
 
 class EnhancedEmbedder:
     def __init__(self):
@@ -27,28 +110,54 @@ class EnhancedEmbedder:
             'Lunch': [0.7, 0.6, 0.8],
             'Dinner': [0.9, 0.4, 0.7]  # comfort, heavy, social
         }
+        
+        # Contiguous lookup tables indexed by integer code; the last row is the default
+        self._cuisine_idx = {c: i for i, c in enumerate(self.cuisine_weights)}
+        self._cuisine_mat = np.array(list(self.cuisine_weights.values()) + [[0.5, 0.5, 0.5]], dtype=np.float32)
+        self._time_idx = {t: i for i, t in enumerate(self.time_weights)}
+        self._time_mat = np.array(list(self.time_weights.values()) + [[0.5, 0.5, 0.5]], dtype=np.float32)
+    
+    def table_signature(self):
+        """Bytes that change whenever the feature lookup tables change"""
+        keys = '|'.join(list(self._cuisine_idx) + list(self._time_idx)).encode('utf-8')
+        return keys + self._cuisine_mat.tobytes() + self._time_mat.tobytes()
+    
+    @staticmethod
+    def _lookup(index, table, values):
+        """Gather table rows for many values, falling back to the default row"""
+        default = len(table) - 1
+        codes = np.fromiter((index.get(v, default) for v in values), dtype=np.intp)
+        return table[codes]
     
     def get_enhanced_embedding(self, description, cuisine, meal_time, cook_time):
         """Get enhanced embedding combining text, cuisine, time, and cooking duration"""
-        # Text embedding
-        text_emb = get_embedding(description)
-        
-        # Feature embeddings
-        cuisine_emb = self.cuisine_weights.get(cuisine, [0.5, 0.5, 0.5])
-        time_emb = self.time_weights.get(meal_time, [0.5, 0.5, 0.5])
+        return self.encode_batch([description], [cuisine], [meal_time], [cook_time])[0]
+    
+    def encode_features(self, cuisines, meal_times, cook_times):
+        """Get the weighted cuisine, time-of-day and duration features for many recipes"""
+        cuisine_mat = self._lookup(self._cuisine_idx, self._cuisine_mat, cuisines)
+        time_mat = self._lookup(self._time_idx, self._time_mat, meal_times)
         
         # Normalize cook time to 0-1
-        time_factor = min(cook_time / 60, 1.0)
+        time_factor = np.minimum(np.asarray(cook_times, dtype=np.float32) / 60, 1.0)[:, None]
         
-        # Combine embeddings (you can experiment with weights)
-        enhanced = np.concatenate([
-            text_emb * 0.7,  # Primary weight on description
-            np.array(cuisine_emb) * 0.2,
-            np.array(time_emb) * 0.1,
-            [time_factor * 0.1]
+        return np.hstack([
+            cuisine_mat * 0.2,
+            time_mat * 0.1,
+            time_factor * 0.1
         ])
-        
-        return enhanced
+    
+    def combine(self, text_embs, features):
+        """Join precomputed text embeddings and features into enhanced embeddings"""
+        return np.hstack([text_embs * 0.7, features])  # Primary weight on description
+    
+    def encode_batch(self, descriptions, cuisines, meal_times, cook_times):
+        """Get enhanced embeddings for many recipes at once, one row per recipe"""
+        # One batched transformer pass for all uncached descriptions
+        text_embs = get_embeddings_batch(descriptions)
+        features = self.encode_features(cuisines, meal_times, cook_times)
+        return self.combine(text_embs, features)
 
 # Keep the original function for backward compatibility
-# get_embedding is already defined above with caching
\ No newline at end of file
+# get_embedding is already defined above with caching
+
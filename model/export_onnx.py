@@ -0,0 +1,23 @@
+"""One-time export of the embedding model to a quantized ONNX graph
+
+Requires the export extras: pip install "optimum[exporters]" onnxruntime
+Run from the repo root: python -m model.export_onnx
+"""
+from pathlib import Path
+from onnxruntime.quantization import quantize_dynamic, QuantType
+from optimum.exporters.onnx import main_export
+from config import EMBEDDING_MODEL, PATHS
+
+def export_quantized_model():
+    """Export the sentence transformer to ONNX and quantize its weights to int8"""
+    int8_path = Path(PATHS['onnx_model'])
+    output_dir = int8_path.parent
+
+    # Writes model.onnx plus the tokenizer files
+    main_export(f"sentence-transformers/{EMBEDDING_MODEL}", output=output_dir, task="feature-extraction")
+
+    quantize_dynamic(output_dir / "model.onnx", int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+if __name__ == "__main__":
+    print(f"Quantized model written to {export_quantized_model()}")
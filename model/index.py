@@ -0,0 +1,48 @@
+import numpy as np
+from utils.filters import top_k_positions
+
+try:
+    import faiss
+except ImportError:  # Optional; fall back to a NumPy matrix-vector product
+    faiss = None
+
+class RecipeIndex:
+    """Inner-product (maximum dot product) search over recipe vectors"""
+
+    def __init__(self, vectors, oversample=8):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.oversample = oversample  # Extra hits fetched to survive post-hoc filtering
+        self._index = None
+
+        if faiss is not None:
+            self._index = faiss.IndexFlatIP(self.vectors.shape[1])
+            self._index.add(self.vectors)
+
+    def search(self, query, k, candidates=None):
+        """Return (scores, row positions) of the k best rows, optionally limited to candidate rows"""
+        query = np.asarray(query, dtype=np.float32)
+
+        if self._index is None:
+            rows = np.arange(len(self.vectors)) if candidates is None else np.asarray(candidates)
+            scores = self.vectors[rows] @ query
+            top = top_k_positions(scores, k)
+            return scores[top], rows[top]
+
+        total = self._index.ntotal
+        allowed = None
+        if candidates is not None:
+            allowed = np.zeros(total, dtype=bool)
+            allowed[candidates] = True
+
+        fetch = min(total, k if allowed is None else k * self.oversample)
+        while True:
+            scores, rows = self._index.search(query[None, :], fetch)
+            scores, rows = scores[0], rows[0]
+            if allowed is not None:
+                keep = allowed[rows]
+                scores, rows = scores[keep], rows[keep]
+
+            # Widen the search if filtering left too few hits
+            if len(rows) >= k or fetch == total:
+                return scores[:k], rows[:k]
+            fetch = min(total, fetch * 2)
@@ -0,0 +1,42 @@
+import numpy as np
+import onnxruntime as ort
+from pathlib import Path
+from transformers import AutoTokenizer
+
+class OnnxEmbedder:
+    """Runs the sentence embedding model through ONNX Runtime (int8 quantized), without PyTorch"""
+
+    max_length = 256  # Same truncation as the SentenceTransformer model
+
+    def __init__(self, model_path):
+        model_path = Path(model_path)
+
+        # The tokenizer files are exported next to the ONNX graph
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path.parent)
+        self.session = ort.InferenceSession(str(model_path), providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, show_progress_bar=False):
+        """Encode texts into a float32 NumPy array, like SentenceTransformer.encode"""
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size, normalize_embeddings)[0]
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            batch = list(texts[start:start + batch_size])
+            encoded = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_length,
+                                     return_tensors='np')
+            token_embs = self.session.run(None, {name: encoded[name] for name in self.input_names})[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = encoded['attention_mask'][..., None].astype(token_embs.dtype)
+            pooled = (token_embs * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            batches.append(pooled)
+
+        if not batches:
+            return np.empty((0, self.session.get_outputs()[0].shape[-1]), dtype=np.float32)
+
+        embeddings = np.vstack(batches).astype(np.float32, copy=False)
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
@@ -26,6 +26,7 @@ class DataLoader:
             # Add computed features
             df['is_quick'] = df['cook_time'] <= 15
             df['is_comfort'] = df['description'].str.lower().str.contains('comfort|cozy|warm|sooth', na=False)
+            df['has_comfort'] = df['description'].str.contains('comfort', case=False, regex=False)
             df['is_healthy'] = df['description'].str.lower().str.contains('fresh|light|healthy|clean', na=False)
             
             return df
@@ -36,8 +37,8 @@ class DataLoader:
             st.error(f"Error loading recipes: {str(e)}")
             return pd.DataFrame()
     
-    def save_embeddings(self, embeddings, recipe_ids):
-        """Save embeddings to cache"""
+    def save_embeddings(self, embeddings, recipe_ids, cache_key=None):
+        """Save embeddings to cache, tagged with a key for the inputs they were built from"""
         if not CACHE_CONFIG['enable_data_cache']:
             return
             
@@ -46,6 +47,7 @@ class DataLoader:
         cache_data = {
             'embeddings': embeddings,
             'recipe_ids': recipe_ids,
+            'cache_key': cache_key,
             'timestamp': pd.Timestamp.now()
         }
         
@@ -55,7 +57,7 @@ class DataLoader:
         except Exception as e:
             st.warning(f"Could not save embeddings cache: {str(e)}")
     
-    def load_embeddings(self, recipe_ids):
+    def load_embeddings(self, recipe_ids, cache_key=None):
         """Load embeddings from cache if available and valid"""
         if not CACHE_CONFIG['enable_data_cache']:
             return None
@@ -78,6 +80,10 @@ class DataLoader:
             if not np.array_equal(cache_data['recipe_ids'], recipe_ids):
                 return None
             
+            # Check if the texts, feature tables and model are unchanged
+            if cache_data.get('cache_key') != cache_key:
+                return None
+            
             return cache_data['embeddings']
             
         except Exception as e:
@@ -1,56 +1,59 @@
 import pandas as pd
 import numpy as np
 
-def filter_recipes(df, diet, meal_time, cook_time):
-    """Original filtering function"""
-    filtered = df.copy()
+def _recipe_mask(df, diet, meal_time, cook_time):
+    """Boolean mask for the basic filters (expects columns normalized by DataLoader.load_recipes)"""
+    mask = (df["meal_time"] == meal_time.title()) & (df["cook_time"] <= cook_time)
 
     if diet != "Any":
-        filtered = filtered[filtered["diet"].str.lower() == diet.lower()]
+        mask &= df["diet"] == diet.lower()
+
+    return mask
 
-    filtered = filtered[filtered["meal_time"].str.lower() == meal_time.lower()]
-    filtered = filtered[filtered["cook_time"] <= cook_time]
-    return filtered
+def filter_recipes(df, diet, meal_time, cook_time):
+    """Original filtering function"""
+    return df.loc[_recipe_mask(df, diet, meal_time, cook_time)]
+
+def map_cuisine_values(cuisines, values, default=0.0):
+    """Look up a per-cuisine value for every row, one dict lookup per distinct cuisine"""
+    codes, uniques = pd.factorize(cuisines, use_na_sentinel=False)
+    lookup = np.array([values.get(c, default) for c in uniques], dtype=float)
+    return lookup[codes]
 
 def filter_with_preferences(df, diet, meal_time, cook_time, user_preferences=None):
     """Enhanced filtering with user preferences"""
     # Apply basic filters
-    filtered = filter_recipes(df, diet, meal_time, cook_time)
+    mask = _recipe_mask(df, diet, meal_time, cook_time)
     
     if user_preferences is None:
-        return filtered
+        return df.loc[mask]
     
     # Remove disliked recipes
     if user_preferences.get('disliked_recipes'):
-        filtered = filtered[~filtered['title'].isin(user_preferences['disliked_recipes'])]
+        mask &= ~df['title'].isin(user_preferences['disliked_recipes'])
+    
+    filtered = df.loc[mask]
     
     # Boost preferred cuisines
-    if user_preferences.get('cuisine_preferences'):
-        cuisine_prefs = user_preferences['cuisine_preferences']
-        filtered = filtered.copy()
-        filtered['cuisine_boost'] = filtered['cuisine'].map(cuisine_prefs).fillna(0)
-    else:
-        filtered['cuisine_boost'] = 0
+    cuisine_prefs = user_preferences.get('cuisine_preferences') or {}
+    return filtered.assign(cuisine_boost=map_cuisine_values(filtered['cuisine'], cuisine_prefs))
+
+def top_k_positions(scores, k):
+    """Positions of the k highest scores, best first, without sorting the rest"""
+    scores = np.asarray(scores)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
     
-    return filtered
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
 
 def apply_diversity_filter(recommendations, max_same_cuisine=2):
     """Ensure diversity in recommendations by limiting same cuisine"""
     if len(recommendations) <= max_same_cuisine:
         return recommendations
     
-    diverse_recs = []
-    cuisine_count = {}
-    
-    for _, recipe in recommendations.iterrows():
-        cuisine = recipe['cuisine']
-        count = cuisine_count.get(cuisine, 0)
-        
-        if count < max_same_cuisine:
-            diverse_recs.append(recipe)
-            cuisine_count[cuisine] = count + 1
-            
-        if len(diverse_recs) >= 3:  # Limit to top 3
-            break
+    # Rank each recipe within its cuisine, keeping the incoming order
+    cuisine_rank = recommendations.groupby('cuisine', sort=False, dropna=False).cumcount()
     
-    return pd.DataFrame(diverse_recs)
\ No newline at end of file
+    return recommendations[cuisine_rank < max_same_cuisine].head(3)  # Limit to top 3
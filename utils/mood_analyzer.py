@@ -1,5 +1,13 @@
 import re
-from textblob import TextBlob
+from bisect import bisect_right
+from functools import lru_cache
+
+@lru_cache(maxsize=256)
+def get_sentiment(text):
+    """Cache sentiment polarity so repeated mood texts skip the TextBlob pipeline"""
+    # Imported on first use; TextBlob pulls in NLTK and slows down app start-up
+    from textblob import TextBlob
+    return TextBlob(text).sentiment.polarity
 
 class MoodAnalyzer:
     """Analyzes user mood text to extract emotional keywords and sentiment"""
@@ -23,6 +31,18 @@ class MoodAnalyzer:
             'quite': 1.2, 'pretty': 1.1, 'somewhat': 0.8, 'slightly': 0.7,
             'a bit': 0.8, 'a little': 0.7, 'totally': 1.8, 'completely': 2.0
         }
+        
+        # One regex with a named group per category, so each text is scanned once
+        pattern = '|'.join(
+            f'(?P<{category}>' + '|'.join(map(re.escape, sorted(keywords, key=len, reverse=True))) + ')'
+            for category, keywords in self.emotion_keywords.items()
+        )
+        self._emotion_re = re.compile(r'\b(?:' + pattern + r')\b')
+        
+        # Same for intensity modifiers, longest first so 'a little' beats shorter overlaps
+        self._intensity_re = re.compile(
+            r'\b(?:' + '|'.join(map(re.escape, sorted(self.intensity_words, key=len, reverse=True))) + r')\b'
+        )
     
     def extract_mood_tags(self, mood_text):
         """Extract mood tags and sentiment from user input"""
@@ -32,25 +52,34 @@ class MoodAnalyzer:
         mood_text_lower = mood_text.lower()
         
         # Extract sentiment using TextBlob
-        blob = TextBlob(mood_text)
-        sentiment = blob.sentiment.polarity
+        sentiment = get_sentiment(mood_text)
+        
+        # Find the first position of every keyword in a single pass
+        keyword_hits = {}
+        for match in self._emotion_re.finditer(mood_text_lower):
+            keyword_hits.setdefault(match.group(), (match.lastgroup, match.start()))
+        
+        # Collect intensity modifier positions once, ordered by end position
+        modifier_hits = [
+            (match.end(), match.start(), self.intensity_words[match.group()])
+            for match in self._intensity_re.finditer(mood_text_lower)
+        ]
+        modifier_ends = [end for end, _, _ in modifier_hits]
+        
+        # Score matching emotion categories
+        category_totals = {}
+        for keyword, (category, keyword_pos) in keyword_hits.items():
+            # Check for intensity modifiers before the keyword
+            intensity = self._get_keyword_intensity(modifier_hits, modifier_ends, keyword_pos)
+            score, matches = category_totals.get(category, (0, 0))
+            category_totals[category] = (score + intensity, matches + 1)
         
-        # Find matching emotion categories
         detected_tags = []
         tag_scores = {}
         
-        for category, keywords in self.emotion_keywords.items():
-            category_score = 0
-            matches = 0
-            
-            for keyword in keywords:
-                if keyword in mood_text_lower:
-                    matches += 1
-                    # Check for intensity modifiers before the keyword
-                    intensity = self._get_keyword_intensity(mood_text_lower, keyword)
-                    category_score += intensity
-            
-            if matches > 0:
+        for category in self.emotion_keywords:
+            if category in category_totals:
+                category_score, matches = category_totals[category]
                 tag_scores[category] = category_score / max(matches, 1)  # Average intensity
                 detected_tags.append(category)
         
@@ -72,20 +101,18 @@ class MoodAnalyzer:
         
         return unique_tags[:5], sentiment  # Limit to top 5 tags
     
-    def _get_keyword_intensity(self, text, keyword):
+    def _get_keyword_intensity(self, modifier_hits, modifier_ends, keyword_pos):
         """Check if there are intensity modifiers near the keyword"""
-        # Find the position of the keyword
-        keyword_pos = text.find(keyword)
-        if keyword_pos == -1:
-            return 1.0
-        
         # Look for intensity modifiers in the 20 characters before the keyword
-        before_text = text[max(0, keyword_pos-20):keyword_pos]
+        window_start = max(0, keyword_pos - 20)
         
         intensity = 1.0
-        for modifier, multiplier in self.intensity_words.items():
-            if modifier in before_text:
+        i = bisect_right(modifier_ends, keyword_pos) - 1
+        while i >= 0 and modifier_ends[i] > window_start:
+            _, start, multiplier = modifier_hits[i]
+            if start >= window_start:
                 intensity = max(intensity, multiplier)  # Use the strongest modifier
+            i -= 1
         
         return intensity
     
@@ -1,8 +1,23 @@
+import os
 import json
+import time
+import atexit
+import numpy as np
+import pandas as pd
 import streamlit as st
-from datetime import datetime, timedelta
+from collections import Counter, deque
+from bisect import bisect_right
+from itertools import islice
+from operator import itemgetter
+from datetime import datetime
 from pathlib import Path
-from config import LEARNING_RATES
+from config import LEARNING_RATES, PROFILE_CONFIG
+from utils.filters import map_cuisine_values
+
+try:
+    import orjson as _json_fast
+except ImportError:  # Optional; fall back to the standard library encoder
+    _json_fast = None
 
 class UserProfileManager:
     """Manages user preferences and learning"""
@@ -11,6 +26,13 @@ class UserProfileManager:
         self.profile_path = Path("cache/user_profiles.json")
         self.profile_path.parent.mkdir(exist_ok=True)
         
+        # Pending changes are written in batches instead of on every feedback
+        self._dirty = False
+        self._pending = 0
+        self._pending_prefs = None
+        self._last_save_ts = time.monotonic()
+        atexit.register(self._flush)
+        
     def initialize_profile(self):
         """Initialize user profile in session state"""
         if 'user_preferences' not in st.session_state:
@@ -19,7 +41,7 @@ class UserProfileManager:
                 'disliked_recipes': [],
                 'cuisine_preferences': {'Desi': 0.0, 'Arabic': 0.0, 'Western': 0.0},
                 'mood_patterns': {},
-                'feedback_history': [],
+                'feedback_history': deque(maxlen=LEARNING_RATES['max_history']),
                 'creation_date': datetime.now().isoformat(),
                 'last_updated': datetime.now().isoformat()
             }
@@ -28,31 +50,38 @@ class UserProfileManager:
         """Add user feedback and update preferences"""
         prefs = st.session_state.user_preferences
         
+        # Read the clock once for the record and the profile
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
         # Create feedback record
         feedback = {
             'recipe_title': recipe_title,
             'rating': rating,
             'mood_tags': mood_tags,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now_iso,
+            'ts': now.timestamp(),  # Epoch seconds, so recency checks never re-parse timestamps
             'cuisine': recipe_data.get('cuisine'),
             'meal_time': recipe_data.get('meal_time'),
             'cook_time': recipe_data.get('cook_time')
         }
         
-        # Add to history
+        # Add to history (the bounded deque drops the oldest entry itself)
         prefs['feedback_history'].append(feedback)
         
-        # Limit history size
-        if len(prefs['feedback_history']) > LEARNING_RATES['max_history']:
-            prefs['feedback_history'] = prefs['feedback_history'][-LEARNING_RATES['max_history']:]
+        # History changed, so cached recent slices and timestamps are stale
+        self._clear_session_caches('_recent_feedback_cache', '_feedback_ts')
         
         # Update preferences based on rating
+        liked, disliked = self._get_feedback_sets()
         if rating >= 4:  # Positive feedback
-            if recipe_title not in prefs['liked_recipes']:
+            if recipe_title not in liked:
+                liked.add(recipe_title)
                 prefs['liked_recipes'].append(recipe_title)
             
             # Remove from dislikes if present
-            if recipe_title in prefs['disliked_recipes']:
+            if recipe_title in disliked:
+                disliked.discard(recipe_title)
                 prefs['disliked_recipes'].remove(recipe_title)
             
             # Update cuisine preference
@@ -62,18 +91,21 @@ class UserProfileManager:
                     current + LEARNING_RATES['cuisine_boost'])
             
             # Learn mood patterns
+            mood_patterns = prefs['mood_patterns']
             for tag in mood_tags:
-                if tag not in prefs['mood_patterns']:
-                    prefs['mood_patterns'][tag] = []
-                if recipe_title not in prefs['mood_patterns'][tag]:
-                    prefs['mood_patterns'][tag].append(recipe_title)
+                patterns = mood_patterns.get(tag)
+                if not isinstance(patterns, set):
+                    patterns = mood_patterns[tag] = set(patterns or ())
+                patterns.add(recipe_title)
         
         elif rating <= 2:  # Negative feedback
-            if recipe_title not in prefs['disliked_recipes']:
+            if recipe_title not in disliked:
+                disliked.add(recipe_title)
                 prefs['disliked_recipes'].append(recipe_title)
             
             # Remove from likes if present
-            if recipe_title in prefs['liked_recipes']:
+            if recipe_title in liked:
+                liked.discard(recipe_title)
                 prefs['liked_recipes'].remove(recipe_title)
             
             # Slightly reduce cuisine preference
@@ -83,10 +115,39 @@ class UserProfileManager:
                     current - LEARNING_RATES['cuisine_boost'] * 0.5)
         
         # Update timestamp
-        prefs['last_updated'] = datetime.now().isoformat()
+        prefs['last_updated'] = now_iso
+        
+        # Auto-save profile (batched)
+        self._mark_dirty(prefs)
+    
+    def _get_feedback_sets(self):
+        """Liked/disliked titles as sets for O(1) membership, kept alongside the saved lists"""
+        prefs = st.session_state.user_preferences
+        liked = st.session_state.get('_liked_set')
+        disliked = st.session_state.get('_disliked_set')
+        
+        # Rebuild lazily, or when the lists were changed without going through this manager
+        if liked is None or len(liked) != len(prefs.get('liked_recipes', [])):
+            liked = st.session_state._liked_set = set(prefs.get('liked_recipes', []))
+        if disliked is None or len(disliked) != len(prefs.get('disliked_recipes', [])):
+            disliked = st.session_state._disliked_set = set(prefs.get('disliked_recipes', []))
+        
+        return liked, disliked
+    
+    def _mark_dirty(self, prefs):
+        """Record an unsaved change and flush once enough have piled up"""
+        self._dirty = True
+        self._pending += 1
+        self._pending_prefs = prefs
         
-        # Auto-save profile
-        self.save_profile()
+        if (self._pending >= PROFILE_CONFIG['save_every'] or
+                time.monotonic() - self._last_save_ts > PROFILE_CONFIG['save_interval']):
+            self._flush()
+    
+    def _flush(self):
+        """Write pending profile changes to disk, if any"""
+        if self._dirty:
+            self.save_profile(self._pending_prefs)
     
     def get_personalized_boost(self, recipe_row):
         """Calculate personalized boost score for a recipe"""
@@ -102,11 +163,12 @@ class UserProfileManager:
             boost += prefs['cuisine_preferences'][cuisine] * 0.3
         
         # Liked recipes boost (similar recipes)
-        if recipe_row.get('title') in prefs['liked_recipes']:
+        liked, disliked = self._get_feedback_sets()
+        if recipe_row.get('title') in liked:
             boost += 0.5
         
         # Disliked recipes penalty
-        if recipe_row.get('title') in prefs['disliked_recipes']:
+        if recipe_row.get('title') in disliked:
             boost -= 1.0  # Strong penalty
         
         # Time-based decay for old feedback
@@ -121,24 +183,73 @@ class UserProfileManager:
         
         return max(-1.0, min(1.0, boost))  # Clamp between -1 and 1
     
+    def get_personalized_boosts(self, df):
+        """Calculate personalized boost scores for every recipe in a DataFrame at once"""
+        if 'user_preferences' not in st.session_state:
+            return np.zeros(len(df))
+        
+        prefs = st.session_state.user_preferences
+        
+        # Cuisine preference boost, via a lookup table over the distinct cuisines
+        boost = map_cuisine_values(df['cuisine'], prefs['cuisine_preferences']) * 0.3
+        
+        # Liked recipes boost and disliked recipes penalty
+        liked, disliked = self._get_feedback_sets()
+        boost += np.where(df['title'].isin(liked), 0.5, 0.0)
+        boost -= np.where(df['title'].isin(disliked), 1.0, 0.0)  # Strong penalty
+        
+        # Boost recipes similar to recently liked ones, once per matching like
+        recent_likes = Counter(
+            (f.get('cuisine'), f.get('meal_time'))
+            for f in self._get_recent_feedback(days=30) if f['rating'] >= 4
+        )
+        if recent_likes:
+            like_counts = pd.Series(recent_likes, dtype=float)
+            recipe_pairs = pd.MultiIndex.from_arrays([df['cuisine'], df['meal_time']])
+            boost += like_counts.reindex(recipe_pairs).fillna(0).to_numpy() * 0.1
+        
+        return np.clip(boost, -1.0, 1.0)  # Clamp between -1 and 1
+    
     def _get_recent_feedback(self, days=30):
         """Get feedback from recent days"""
         if 'user_preferences' not in st.session_state:
             return []
         
-        prefs = st.session_state.user_preferences
-        cutoff_date = datetime.now() - timedelta(days=days)
+        history = st.session_state.user_preferences.get('feedback_history', [])
         
-        recent = []
-        for feedback in prefs.get('feedback_history', []):
-            try:
-                feedback_date = datetime.fromisoformat(feedback['timestamp'])
-                if feedback_date > cutoff_date:
-                    recent.append(feedback)
-            except (KeyError, ValueError):
-                continue
+        # Memoized per session until the history changes
+        cache = st.session_state.setdefault('_recent_feedback_cache', {})
+        key = (days, len(history))
+        if key not in cache:
+            # History is ordered by 'ts', so recent feedback is a tail slice
+            cache[key] = list(islice(history, self._recent_start(history, days), None))
         
-        return recent
+        return cache[key]
+    
+    def _recent_start(self, history, days):
+        """Position of the first feedback newer than `days` ago, by binary search on 'ts'"""
+        # Deque indexing is O(n) toward the middle, so bisect a list of the timestamps instead
+        ts = st.session_state.get('_feedback_ts')
+        if ts is None or len(ts) != len(history):
+            # Entries without 'ts' count as old
+            ts = st.session_state['_feedback_ts'] = [f.get('ts', 0.0) for f in history]
+        return bisect_right(ts, time.time() - days * 86400)
+    
+    @staticmethod
+    def _add_epoch_timestamps(history):
+        """Parse each ISO timestamp once into epoch seconds and keep history ordered by it"""
+        for feedback in history:
+            try:
+                feedback['ts'] = datetime.fromisoformat(feedback['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                feedback['ts'] = 0.0  # Unparseable entries never count as recent
+        history.sort(key=lambda feedback: feedback['ts'])
+    
+    def _clear_session_caches(self, *keys):
+        """Drop derived per-session data so it is rebuilt from the profile on next use"""
+        for key in keys or ('_liked_set', '_disliked_set', '_recent_feedback_cache', '_feedback_ts'):
+            if key in st.session_state:
+                del st.session_state[key]
     
     def get_profile_summary(self):
         """Get a summary of user preferences"""
@@ -149,18 +260,20 @@ class UserProfileManager:
         
         # Calculate favorite cuisine
         cuisine_prefs = prefs.get('cuisine_preferences', {})
-        fav_cuisine = max(cuisine_prefs, key=cuisine_prefs.get) if cuisine_prefs else "None"
+        fav_cuisine = max(cuisine_prefs.items(), key=itemgetter(1))[0] if cuisine_prefs else "None"
         
-        # Get recent activity
-        recent_feedback = self._get_recent_feedback(days=7)
+        # Get recent activity; only the count is needed, not the entries
+        history = prefs.get('feedback_history', [])
+        total_feedback = len(history)
+        recent_activity = total_feedback - self._recent_start(history, days=7)
         
         summary = {
-            'total_feedback': len(prefs.get('feedback_history', [])),
+            'total_feedback': total_feedback,
             'liked_recipes': len(prefs.get('liked_recipes', [])),
             'disliked_recipes': len(prefs.get('disliked_recipes', [])),
             'favorite_cuisine': fav_cuisine,
             'cuisine_scores': cuisine_prefs,
-            'recent_activity': len(recent_feedback),
+            'recent_activity': recent_activity,
             'mood_patterns': len(prefs.get('mood_patterns', {})),
             'profile_age_days': self._get_profile_age_days()
         }
@@ -181,25 +294,58 @@ class UserProfileManager:
     
     def reset_profile(self):
         """Reset user profile to default state"""
-        if 'user_preferences' in st.session_state:
-            del st.session_state.user_preferences
-        self.initialize_profile()
+        # A profile with no recorded feedback is already at its defaults
+        prefs = st.session_state.get('user_preferences')
+        if prefs is None or any(prefs.get(key) for key in
+                                ('feedback_history', 'liked_recipes', 'disliked_recipes', 'mood_patterns')):
+            st.session_state.pop('user_preferences', None)
+            self._clear_session_caches()
+            self.initialize_profile()
         
-        # Remove saved profile file
-        if self.profile_path.exists():
-            try:
-                self.profile_path.unlink()
-            except:
-                pass
+        # Drop unsaved changes and remove saved profile file
+        self._dirty = False
+        self._pending = 0
+        try:
+            self.profile_path.unlink(missing_ok=True)
+        except OSError as e:
+            st.warning(f"Could not remove saved profile: {str(e)}")
     
-    def save_profile(self):
+    @staticmethod
+    def _serializable(prefs):
+        """Shallow copy of the profile with in-memory containers turned into JSON types"""
+        data = dict(prefs)
+        if 'feedback_history' in data:
+            data['feedback_history'] = list(data['feedback_history'])
+        if 'mood_patterns' in data:
+            data['mood_patterns'] = {tag: sorted(titles) for tag, titles in data['mood_patterns'].items()}
+        return data
+    
+    def save_profile(self, prefs=None):
         """Save user profile to disk"""
-        if 'user_preferences' not in st.session_state:
-            return
+        if prefs is None:
+            if 'user_preferences' not in st.session_state:
+                return
+            prefs = st.session_state.user_preferences
         
         try:
-            with open(self.profile_path, 'w') as f:
-                json.dump(st.session_state.user_preferences, f, indent=2)
+            data = self._serializable(prefs)
+            
+            # Write a temp file and swap it in, so a crash never leaves a partial profile
+            tmp_path = self.profile_path.with_suffix('.tmp')
+            if _json_fast is not None:
+                tmp_path.write_bytes(_json_fast.dumps(data))
+            elif len(data.get('feedback_history', ())) >= PROFILE_CONFIG['stream_min_history']:
+                # Encode large profiles chunk by chunk rather than into one big string
+                chunks = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).iterencode(data)
+                with open(tmp_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                    f.writelines(chunks)
+            else:
+                tmp_path.write_bytes(json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+            os.replace(tmp_path, self.profile_path)
+            
+            self._dirty = False
+            self._pending = 0
+            self._last_save_ts = time.monotonic()
         except Exception as e:
             st.warning(f"Could not save user profile: {str(e)}")
     
@@ -209,13 +355,27 @@ class UserProfileManager:
             return
         
         try:
-            with open(self.profile_path, 'r') as f:
-                saved_prefs = json.load(f)
+            if _json_fast is not None:
+                saved_prefs = _json_fast.loads(self.profile_path.read_bytes())
+            else:
+                with open(self.profile_path, 'r', encoding='utf-8') as f:
+                    saved_prefs = json.load(f)
             
             # Merge with current session state
+            if 'feedback_history' in saved_prefs:
+                history = saved_prefs['feedback_history']
+                self._add_epoch_timestamps(history)
+                saved_prefs['feedback_history'] = deque(history, maxlen=LEARNING_RATES['max_history'])
+            if 'mood_patterns' in saved_prefs:
+                saved_prefs['mood_patterns'] = {
+                    tag: set(titles) for tag, titles in saved_prefs['mood_patterns'].items()
+                }
             self.initialize_profile()
             st.session_state.user_preferences.update(saved_prefs)
             
+            # Derived data is rebuilt from the loaded profile on next use
+            self._clear_session_caches()
+            
         except Exception as e:
             st.warning(f"Could not load saved profile: {str(e)}")
 
@@ -3,65 +3,102 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
+from config import CACHE_CONFIG, VIZ_CONFIG
+
+try:
+    from scipy.linalg import svd as _scipy_svd
+except ImportError:  # Optional; fall back to NumPy's SVD
+    _scipy_svd = None
+
+def _thin_svd(x):
+    """Thin SVD, using scipy's divide-and-conquer driver when available"""
+    if _scipy_svd is not None:
+        return _scipy_svd(x, full_matrices=False, lapack_driver='gesdd')
+    return np.linalg.svd(x, full_matrices=False)
+
+def _fallback_bar_chart(df):
+    """Simple similarity bar chart for when the 2D projection is unavailable"""
+    fig = px.bar(
+        df.head(5),
+        x='similarity',
+        y='title',
+        orientation='h',
+        color='cuisine',
+        title="Top Recipe Matches for Your Mood"
+    )
+    
+    fig.update_layout(
+        width=700,
+        height=400,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    
+    return fig
+
+@st.cache_data(max_entries=VIZ_CONFIG['projection_cache_size'], ttl=CACHE_CONFIG['cache_ttl'])
+def _project_2d(mood_emb_bytes, recipe_emb_bytes, shape):
+    """Project the mood (row 0) and recipe embeddings onto their top two principal components"""
+    mood_embedding = np.frombuffer(mood_emb_bytes, dtype=np.float32)
+    recipe_embeddings = np.frombuffer(recipe_emb_bytes, dtype=np.float32).reshape(shape)
+    
+    # Stack mood and recipe embeddings (same dimension) into one preallocated buffer
+    min_dim = min(len(mood_embedding), shape[1])
+    all_embeddings = np.empty((1 + shape[0], min_dim), dtype=np.float32)
+    all_embeddings[0] = mood_embedding[:min_dim]
+    all_embeddings[1:] = recipe_embeddings[:, :min_dim]
+    
+    # PCA is the SVD of the centered matrix
+    centered = all_embeddings - all_embeddings.mean(axis=0)
+    U, S, _ = _thin_svd(centered)
+    return U[:, :2] * S[:2]
 
 def create_mood_visualization(df, mood_embedding, recipe_embeddings):
     """Create an interactive visualization of mood-recipe similarity"""
     try:
-        # Simple 2D projection using PCA (fallback if UMAP not available)
-        from sklearn.decomposition import PCA
-        
-        # Ensure all embeddings have same dimension
-        min_dim = min(len(mood_embedding), min(len(emb) for emb in recipe_embeddings))
-        mood_emb_truncated = mood_embedding[:min_dim]
-        recipe_embs_truncated = [emb[:min_dim] for emb in recipe_embeddings]
-        
-        all_embeddings = np.vstack([mood_emb_truncated.reshape(1, -1)] + recipe_embs_truncated)
-        
-        # Reduce to 2D
-        reducer = PCA(n_components=2, random_state=42)
-        reduced = reducer.fit_transform(all_embeddings)
-        
-        # Create the plot data
-        plot_data = []
+        # Bytes are cheap to hash, so reruns with the same embeddings hit the cache
+        mood_embedding = np.ascontiguousarray(mood_embedding, dtype=np.float32)
+        recipe_embeddings = np.ascontiguousarray(recipe_embeddings, dtype=np.float32)
+        reduced = _project_2d(mood_embedding.tobytes(), recipe_embeddings.tobytes(),
+                              recipe_embeddings.shape)
         
-        # Add recipes
-        for i, (_, recipe) in enumerate(df.iterrows()):
-            plot_data.append({
-                'x': reduced[i+1, 0],
-                'y': reduced[i+1, 1],
-                'name': recipe['title'],
-                'cuisine': recipe['cuisine'],
-                'similarity': recipe['similarity'],
-                'cook_time': recipe['cook_time'],
-                'type': 'Recipe'
-            })
+        # Recipe columns as arrays (row 0 of reduced is the mood)
+        x, y = reduced[1:, 0], reduced[1:, 1]
+        titles = df['title'].to_numpy()
+        cuisines = df['cuisine'].to_numpy()
+        similarity = df['similarity'].to_numpy(dtype=float)
+        cook_times = df['cook_time'].to_numpy()
+        sizes = np.maximum(similarity, 0) * 20
         
-        # Convert to DataFrame
-        plot_df = pd.DataFrame(plot_data)
-        
-        # Create scatter plot
-        fig = px.scatter(
-            plot_df,
-            x='x', y='y',
-            color='cuisine',
-            size='similarity',
-            hover_data=['name', 'cook_time'],
-            title="Recipe-Mood Similarity Space",
-            labels={'x': 'Dimension 1', 'y': 'Dimension 2'}
-        )
+        # One WebGL trace per cuisine, selected with boolean masks
+        traces = []
+        for cuisine in pd.unique(cuisines):
+            mask = cuisines == cuisine
+            traces.append(go.Scattergl(
+                x=x[mask],
+                y=y[mask],
+                mode='markers',
+                marker=dict(size=sizes[mask]),
+                customdata=np.column_stack([titles[mask], cook_times[mask]]),
+                hovertemplate="%{customdata[0]}<br>Cook time: %{customdata[1]} min<extra></extra>",
+                name=str(cuisine)
+            ))
         
         # Add mood point
-        fig.add_scatter(
-            x=[reduced[0, 0]], 
-            y=[reduced[0, 1]], 
+        traces.append(go.Scattergl(
+            x=[reduced[0, 0]],
+            y=[reduced[0, 1]],
             mode='markers',
             marker=dict(symbol='star', size=20, color='red'),
-            name='Your Mood',
-            showlegend=True
-        )
+            name='Your Mood'
+        ))
+        
+        fig = go.Figure(data=traces)
         
         # Update layout
         fig.update_layout(
+            title="Recipe-Mood Similarity Space",
+            xaxis_title='Dimension 1',
+            yaxis_title='Dimension 2',
             width=700,
             height=500,
             showlegend=True
@@ -69,39 +106,37 @@ def create_mood_visualization(df, mood_embedding, recipe_embeddings):
         
         return fig
         
-    except ImportError:
-        # Fallback: simple similarity bar chart
-        fig = px.bar(
-            df.head(5),
-            x='similarity',
-            y='title',
-            orientation='h',
-            color='cuisine',
-            title="Top Recipe Matches for Your Mood"
-        )
-        
-        fig.update_layout(
-            width=700,
-            height=400,
-            yaxis={'categoryorder': 'total ascending'}
-        )
-        
-        return fig
+    except np.linalg.LinAlgError:
+        # SVD did not converge; show the matches without the projection
+        return _fallback_bar_chart(df)
     
     except Exception as e:
         st.error(f"Visualization error: {str(e)}")
         return None
 
+def _as_frame(recommendations):
+    """Columnar view of the recommendations; accepts a DataFrame or a list of dicts"""
+    if isinstance(recommendations, pd.DataFrame):
+        return recommendations
+    return pd.DataFrame(list(recommendations or []))
+
+def _column(df, name, default):
+    """Column values as an array, or the default for every row when the column is missing"""
+    if name in df:
+        return df[name].to_numpy()
+    return np.full(len(df), default)
+
 def create_mood_dashboard(recommendations):
     """Create a dashboard showing recommendation metrics"""
-    if not recommendations:
+    rec_df = _as_frame(recommendations)
+    if rec_df.empty:
         return
     
     # Calculate metrics
-    avg_cook_time = np.mean([r['cook_time'] for r in recommendations])
-    avg_similarity = np.mean([r['similarity'] for r in recommendations])
-    cuisines = [r['cuisine'] for r in recommendations]
-    dominant_cuisine = max(set(cuisines), key=cuisines.count) if cuisines else "Mixed"
+    avg_cook_time = rec_df['cook_time'].mean()
+    avg_similarity = rec_df['similarity'].mean()
+    cuisine_counts = rec_df['cuisine'].value_counts()
+    dominant_cuisine = cuisine_counts.index[0] if len(cuisine_counts) else "Mixed"
     
     # Display metrics in columns
     col1, col2, col3, col4 = st.columns(4)
@@ -113,18 +148,18 @@ def create_mood_dashboard(recommendations):
         st.metric("Mood Match", f"{avg_similarity:.1%}")
     
     with col3:
-        st.metric("Recipes Found", len(recommendations))
+        st.metric("Recipes Found", len(rec_df))
     
     with col4:
         st.metric("Primary Cuisine", dominant_cuisine)
 
 def create_cuisine_distribution_chart(recommendations):
     """Create a pie chart showing cuisine distribution"""
-    if not recommendations:
+    rec_df = _as_frame(recommendations)
+    if rec_df.empty:
         return None
     
-    cuisines = [r['cuisine'] for r in recommendations]
-    cuisine_counts = pd.Series(cuisines).value_counts()
+    cuisine_counts = rec_df['cuisine'].value_counts()
     
     fig = px.pie(
         values=cuisine_counts.values,
@@ -136,15 +171,13 @@ def create_cuisine_distribution_chart(recommendations):
 
 def create_cooking_time_chart(recommendations):
     """Create a chart showing cooking time distribution"""
-    if not recommendations:
+    rec_df = _as_frame(recommendations)
+    if rec_df.empty:
         return None
     
-    cook_times = [r['cook_time'] for r in recommendations]
-    titles = [r['title'] for r in recommendations]
-    
     fig = px.bar(
-        x=titles,
-        y=cook_times,
+        x=rec_df['title'].to_numpy(),
+        y=rec_df['cook_time'].to_numpy(),
         title="Cooking Time by Recipe",
         labels={'x': 'Recipe', 'y': 'Cook Time (minutes)'}
     )
@@ -155,30 +188,32 @@ def create_cooking_time_chart(recommendations):
 
 def create_similarity_radar_chart(recommendations, max_recipes=5):
     """Create a radar chart comparing recipe similarities"""
-    if not recommendations:
-        return None
-    
     # Take top recipes
-    top_recipes = recommendations[:max_recipes]
+    top_recipes = _as_frame(recommendations).head(max_recipes)
+    if top_recipes.empty:
+        return None
     
     # Create radar chart data
     categories = ['Mood Match', 'Quick to Make', 'Comfort Level']
     
+    # Calculate scores (normalize to 0-1) for all recipes at once
+    similarity = _column(top_recipes, 'similarity', 0)
+    quick_score = 1 - _column(top_recipes, 'cook_time', 30) / 60  # Inverse of cook time
+    if 'has_comfort' in top_recipes:
+        has_comfort = top_recipes['has_comfort'].to_numpy(dtype=bool)
+    else:  # Not precomputed by the data loader
+        descriptions = pd.Series(_column(top_recipes, 'description', ''), dtype=object).fillna('')
+        has_comfort = descriptions.str.contains('comfort', case=False, regex=False).to_numpy(dtype=bool)
+    comfort_score = np.where(has_comfort, 0.8, 0.5)
+    
     fig = go.Figure()
     
-    for i, recipe in enumerate(top_recipes):
-        # Calculate scores (normalize to 0-1)
-        similarity = recipe.get('similarity', 0)
-        quick_score = 1 - (recipe.get('cook_time', 30) / 60)  # Inverse of cook time
-        comfort_score = 0.8 if 'comfort' in recipe.get('description', '').lower() else 0.5
-        
-        values = [similarity, quick_score, comfort_score]
-        
+    for title, values in zip(top_recipes['title'], zip(similarity, quick_score, comfort_score)):
         fig.add_trace(go.Scatterpolar(
-            r=values,
+            r=list(values),
             theta=categories,
             fill='toself',
-            name=recipe['title'][:20] + ("..." if len(recipe['title']) > 20 else "")
+            name=title[:20] + "..." if len(title) > 20 else title
         ))
     
     fig.update_layout(